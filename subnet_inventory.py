@@ -12,14 +12,48 @@ Usage: python3 subnet_inventory.py [arguments]
 """
 
 import argparse
+import array
 import ipaddress
 import os
-import re
+import shutil
+import sqlite3
+import stat
+import struct
 import sys
+import tempfile
 
-# TODO: A flat file is not the ideal solution for this system, a database would be a better solution
+# SQLite database holding the inventory
 INVENTORY_PATH = "/subnet_inventory/inventory"
-reserved_subnets = ["192.168.14.128/25"]
+
+# each subnet is stored with the address as given (host bits included) and the first and last addresses of the
+# subnet.  The conflict query binary searches subnets_by_start, which is sorted by first address and covers every
+# column the query needs, so it never has to look rows up in the table
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subnets (
+    name TEXT PRIMARY KEY,
+    address INTEGER NOT NULL,
+    prefixlen INTEGER NOT NULL,
+    net_min INTEGER NOT NULL,
+    net_max INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subnets_by_start ON subnets (net_min, prefixlen, net_max, address, name);
+CREATE INDEX IF NOT EXISTS subnets_by_address ON subnets (address, prefixlen);
+"""
+_INSERT_SUBNET = "INSERT INTO subnets (name, address, prefixlen, net_min, net_max) VALUES (?, ?, ?, ?, ?)"
+# let SQLite read the database through a memory map of up to this many bytes instead of copying pages
+_MMAP_SIZE = 256 * 1024 * 1024
+# every SQLite database file starts with this header
+_SQLITE_HEADER = b"SQLite format 3\0"
+# record layout of the inventory written by an earlier version of this script, only read to convert it: the name
+# encoded as UTF-8 and padded with NUL bytes, the IPv4 address as given and the prefix length
+_RECORD = struct.Struct("<32sIBxxx")
+# answers accepted by _prompt_yn, compared in lowercase
+_YES_NO = {"y": True, "yes": True, "n": False, "no": False}
+
+# connection to the inventory database, opened by _get_connection()
+_CONNECTION = None
+# whether the inventory exists, probed once by _inventory_exists()
+_INVENTORY_EXISTS = None
 
 
 class Subnet:
@@ -32,11 +66,435 @@ class Subnet:
         self.cidr_string = cidr_string
 
 
-def add_subnet(subnet_object=None):
+class _PrefixTrie:
+    """Binary radix trie of network prefixes, one bit per level.  Every prefix that overlaps a given network is
+    either on the path from the root to that network or somewhere below it, so overlap lookups only walk the
+    prefix bits instead of comparing against every prefix in the trie.
+
+    Nodes are stored as parallel arrays indexed by node number rather than as one object per node: the children
+    of node i for the next bit being 0 and 1 are _children[0][i] and _children[1][i] (0 where there is no child,
+    since the root is never a child) and the Subnet objects whose network ends at node i are _entries[i] (None
+    where there are none).
+
+    width: Integer, the number of bits in an address of the IP version held by this trie"""
+
+    def __init__(self, width=32):
+        self.width = width
+        self._children = (array.array('l', [0]), array.array('l', [0]))
+        self._entries = [None]
+
+    def _shifts(self, prefixlen):
+        # shifting the network right by these amounts brings each prefix bit, most significant first, to bit 0
+        return range(self.width - 1, self.width - 1 - prefixlen, -1)
+
+    def insert(self, network_int, prefixlen, entry):
+        """Adds an entry under the given network
+
+        Args:
+            network_int: Integer, the network address of the prefix to file the entry under
+            prefixlen: Integer, the prefix length of the prefix to file the entry under
+            entry: Subnet object to store
+
+        Returns:
+            Void
+
+        Raises:
+            None
+        """
+        children = self._children
+        zero, one = children
+        entries = self._entries
+        node = 0
+        for shift in self._shifts(prefixlen):
+            bit_children = children[(network_int >> shift) & 1]
+            child = bit_children[node]
+            if not child:
+                child = len(entries)
+                bit_children[node] = child
+                zero.append(0)
+                one.append(0)
+                entries.append(None)
+            node = child
+        if entries[node] is None:
+            entries[node] = [entry]
+        else:
+            entries[node].append(entry)
+
+    def overlapping(self, network_int, prefixlen):
+        """Finds every entry whose network overlaps the given network
+
+        Args:
+            network_int: Integer, the network address of the subnet to check for overlaps against
+            prefixlen: Integer, the prefix length of the subnet to check for overlaps against
+
+        Returns:
+            found: list of Subnet objects that overlap, supernets first
+
+        Raises:
+            None
+        """
+        children = self._children
+        zero, one = children
+        entries = self._entries
+
+        # every node on the path is a supernet of (or equal to) the network
+        node = 0
+        found = list(entries[0] or ())
+        for shift in self._shifts(prefixlen):
+            node = children[(network_int >> shift) & 1][node]
+            if not node:
+                return found
+            if entries[node] is not None:
+                found.extend(entries[node])
+
+        # every node below the network is one of its subnets
+        stack = [child for child in (zero[node], one[node]) if child]
+        while stack:
+            node = stack.pop()
+            if entries[node] is not None:
+                found.extend(entries[node])
+            if zero[node]:
+                stack.append(zero[node])
+            if one[node]:
+                stack.append(one[node])
+
+        return found
+
+
+def _prefix_mask_v4(prefixlen):
+    """Gets the IPv4 netmask for a prefix length
+
+    Args:
+        prefixlen: Integer, the prefix length of the subnet
+
+    Returns:
+        Integer: the netmask of the subnet
+
+    Raises:
+        None
+    """
+    return (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+
+
+def _split_cidr_v4(cidr_string):
+    """Splits an IPv4 subnet address in CIDR format into integers without building an ipaddress object
+
+    Args:
+        cidr_string: String representing an IPv4 subnet address in CIDR format, host bits may be set
+
+    Returns:
+        Tuple: (address_int, prefixlen) with any host bits of address_int left as given
+
+    Raises:
+        ValueError if cidr_string is not an IPv4 subnet address
+    """
+    address, _, prefix = cidr_string.partition('/')
+    prefixlen = int(prefix) if prefix else 32
+    octets = address.split('.')
+    if len(octets) != 4 or not 0 <= prefixlen <= 32:
+        raise ValueError("{cidr} is not an IPv4 subnet".format(cidr=cidr_string))
+
+    address_int = 0
+    for octet in octets:
+        value = int(octet)
+        if not 0 <= value <= 255:
+            raise ValueError("{cidr} is not an IPv4 subnet".format(cidr=cidr_string))
+        address_int = (address_int << 8) | value
+
+    return address_int, prefixlen
+
+
+def _parse_cidr_v4(cidr_string):
+    """Parses an IPv4 subnet address in CIDR format into integers without building an ipaddress object
+
+    Args:
+        cidr_string: String representing an IPv4 subnet address in CIDR format, host bits may be set
+
+    Returns:
+        Tuple: (network_int, mask_int, prefixlen) with the host bits of network_int cleared
+
+    Raises:
+        ValueError if cidr_string is not an IPv4 subnet address
+    """
+    address_int, prefixlen = _split_cidr_v4(cidr_string)
+    mask_int = _prefix_mask_v4(prefixlen)
+    return address_int & mask_int, mask_int, prefixlen
+
+
+def _format_cidr_v4(address_int, prefixlen):
+    """Formats integers as an IPv4 subnet address in CIDR format
+
+    Args:
+        address_int: Integer, the address of the subnet
+        prefixlen: Integer, the prefix length of the subnet
+
+    Returns:
+        String: the subnet address in CIDR format
+
+    Raises:
+        None
+    """
+    return "{0}.{1}.{2}.{3}/{4}".format(address_int >> 24, (address_int >> 16) & 0xFF, (address_int >> 8) & 0xFF,
+                                        address_int & 0xFF, prefixlen)
+
+
+def _build_reserved_trie(reserved_subnets=None):
+    """Builds the prefix trie of the reserved subnets, once at import
+
+    Args:
+        reserved_subnets: Iterable of Strings representing the reserved subnets in CIDR format
+
+    Returns:
+        _PrefixTrie: trie of the reserved subnets
+
+    Raises:
+        ValueError if a reserved subnet is not an IPv4 subnet
+    """
+    trie = _PrefixTrie(width=32)
+    for cidr_string in reserved_subnets:
+        network_int, _, prefixlen = _parse_cidr_v4(cidr_string)
+        trie.insert(network_int, prefixlen, Subnet(name="reserved", cidr_string=cidr_string))
+    return trie
+
+
+_RESERVED = _build_reserved_trie(reserved_subnets=("192.168.14.128/25",))
+
+
+def _range_v4(network_int, prefixlen):
+    """Gets the first and last addresses of an IPv4 subnet
+
+    Args:
+        network_int: Integer, the network address of the subnet with its host bits cleared
+        prefixlen: Integer, the prefix length of the subnet
+
+    Returns:
+        Tuple: (net_min, net_max) the first and last addresses of the subnet
+
+    Raises:
+        None
+    """
+    return network_int, network_int | (~_prefix_mask_v4(prefixlen) & 0xFFFFFFFF)
+
+
+def _subnet_values(name=None, address_int=None, prefixlen=None):
+    """Gets the column values of the subnets table for a subnet
+
+    Args:
+        name: String, the given name of the subnet
+        address_int: Integer, the address of the subnet as given, host bits included
+        prefixlen: Integer, the prefix length of the subnet
+
+    Returns:
+        Tuple: (name, address, prefixlen, net_min, net_max) in the order used by _INSERT_SUBNET
+
+    Raises:
+        None
+    """
+    return (name, address_int, prefixlen) + _range_v4(address_int & _prefix_mask_v4(prefixlen), prefixlen)
+
+
+def _connect(path=None):
+    """Opens an inventory database, creating the subnets table and its indexes if they do not exist yet
+
+    Args:
+        path: String representing the path of the database file
+
+    Returns:
+        sqlite3.Connection: connection to the database
+
+    Raises:
+        sqlite3.Error if the file cannot be opened as a database
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA mmap_size = {size}".format(size=_MMAP_SIZE))
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _inventory_exists():
+    """Checks whether the inventory exists.  The file system is only probed on the first call, later calls within
+    the same run reuse the answer
+
+    Args:
+        None
+
+    Returns:
+        Boolean:
+            True if the inventory exists
+            False otherwise
+
+    Raises:
+        None
+    """
+    global _INVENTORY_EXISTS
+    if _INVENTORY_EXISTS is None:
+        _INVENTORY_EXISTS = os.path.exists(INVENTORY_PATH)
+    return _INVENTORY_EXISTS
+
+
+def _get_connection():
+    """Gets the connection to the inventory database, opening it on first use
+
+    Args:
+        None
+
+    Returns:
+        sqlite3.Connection: connection to the inventory database
+
+    Raises:
+        FileNotFoundError if inventory has not yet been created
+    """
+    global _CONNECTION
+    if _CONNECTION is None:
+        # connecting to a missing database would quietly create an empty one
+        if not _inventory_exists():
+            raise FileNotFoundError("Subnet inventory does not exist: {path}".format(path=INVENTORY_PATH))
+        _CONNECTION = _connect(path=INVENTORY_PATH)
+    return _CONNECTION
+
+
+def _read_flat_inventory(data=None):
+    """Reads the subnets out of an inventory written by an earlier version of this script, which stored either one
+    "name address" line per subnet or one fixed-width _RECORD per subnet
+
+    Args:
+        data: Bytes, the contents of the inventory file
+
+    Returns:
+        List: (name, address_int, prefixlen) tuple for every subnet in the inventory
+
+    Raises:
+        ValueError if a subnet is not an IPv4 subnet, a name is used by more than one subnet or the last record is
+        incomplete
+    """
+    subnets = []
+    # every record ends in NUL padding, which never appears in a text inventory, so the first record is enough to
+    # tell the formats apart
+    if b'\0' in data[:_RECORD.size]:
+        if len(data) % _RECORD.size:
+            raise ValueError("the inventory ends in a partial record")
+        for name, address_int, prefixlen in _RECORD.iter_unpack(data):
+            subnets.append((name.rstrip(b'\0').decode(), address_int, prefixlen))
+    else:
+        for line in data.decode().splitlines():
+            # the name is everything before the last space
+            name, _, cidr_string = line.rstrip().rpartition(' ')
+            if cidr_string:
+                subnets.append((name,) + _split_cidr_v4(cidr_string))
+
+    names = set()
+    for name, _, _ in subnets:
+        if name in names:
+            raise ValueError("{name} is used by more than one subnet".format(name=name))
+        names.add(name)
+
+    return subnets
+
+
+def _migrate_flat_inventory():
+    """Converts an inventory written by an earlier version of this script to a database.  The database is built
+    next to the inventory and renamed over it, and a copy of the old inventory is kept with a .old suffix
+
+    Args:
+        None
+
+    Returns:
+        Boolean:
+            True if the inventory was converted
+            False if it was already a database
+
+    Raises:
+        FileNotFoundError if inventory has not yet been created
+        ValueError if the old inventory cannot be converted, the inventory is left unchanged
+    """
+    with open(INVENTORY_PATH, "rb") as f:
+        header = f.read(len(_SQLITE_HEADER))
+        # SQLite treats an empty file, as created by the setup script, as an empty database
+        if not header or header == _SQLITE_HEADER:
+            return False
+        # only an old inventory that is about to be converted is read in full
+        inventory = header + f.read()
+
+    subnets = _read_flat_inventory(data=inventory)
+
+    mode = stat.S_IMODE(os.stat(INVENTORY_PATH).st_mode)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(INVENTORY_PATH))
+    os.close(fd)
+    try:
+        connection = _connect(path=temp_path)
+        try:
+            with connection:
+                connection.executemany(_INSERT_SUBNET, (_subnet_values(*subnet) for subnet in subnets))
+        finally:
+            connection.close()
+        # keep the permissions given to the inventory by the setup script
+        os.chmod(temp_path, mode)
+        shutil.copy2(INVENTORY_PATH, INVENTORY_PATH + ".old")
+        os.replace(temp_path, INVENTORY_PATH)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return True
+
+
+def _conflict_rows(network_int=None, prefixlen=None):
+    """Queries the inventory for the subnets that overlap a given subnet.  Two subnets overlap only when one
+    contains the other, so the query is the union of the subnets inside the given one, which start within its
+    range, and the subnets containing it, which start at its network address with the host bits of their own prefix
+    length cleared.  Both halves are binary searches of the subnets_by_start index rather than a scan of the table
+
+    Args:
+        network_int: Integer, the network address of the subnet with its host bits cleared
+        prefixlen: Integer, the prefix length of the subnet
+
+    Returns:
+        List: (name, address_int, prefixlen) tuple for every overlapping subnet, supernets first
+
+    Raises:
+        FileNotFoundError if inventory has not yet been created
+    """
+    net_min, net_max = _range_v4(network_int, prefixlen)
+    containing_starts = sorted({network_int & _prefix_mask_v4(length) for length in range(prefixlen)})
+    query = ("SELECT name, address, prefixlen FROM subnets "
+             "WHERE prefixlen >= ? AND net_min BETWEEN ? AND ? "
+             "UNION ALL "
+             "SELECT name, address, prefixlen FROM subnets "
+             "WHERE prefixlen < ? AND net_max >= ? AND net_min IN ({starts}) "
+             "ORDER BY prefixlen, address").format(starts=", ".join("?" * len(containing_starts)))
+    return _get_connection().execute(query, [prefixlen, net_min, net_max, prefixlen, net_max]
+                                     + containing_starts).fetchall()
+
+
+def _prompt_yn(message=None):
+    """Asks the user a yes or no question until they answer with one of the keys of _YES_NO
+
+    Args:
+        message: String, the question to ask the user
+
+    Returns:
+        Boolean:
+            True if the user answered yes
+            False if the user answered no
+
+    Raises:
+        None
+    """
+    while True:
+        answer = _YES_NO.get(input(message).strip().lower())
+        if answer is not None:
+            return answer
+        print("Please select Y or n")
+
+
+def add_subnet(subnet_object=None, conflicting_subnets=None):
     """Adds a new subnet to inventory
 
     Args:
         subnet_object: Instance of Subnet representing the subnet to add to inventory
+        conflicting_subnets: list of Subnet objects in the inventory that the subnet conflicts with, if the caller
+            has already found them, otherwise they are looked up
 
     Returns:
         Void
@@ -44,35 +502,34 @@ def add_subnet(subnet_object=None):
     Raises:
         None
     """
-    # first check if conflict with a reserved subnet
-    for reserved in reserved_subnets:
-        if subnets_conflict(ipaddress.ip_network(subnet_object.cidr_string, strict=False),
-                            ipaddress.ip_network(reserved, strict=False)):
-            print("Subnet is reserved or conflicts with a reserved subnet and cannot be added")
-            return
+    address_int, prefixlen = _split_cidr_v4(subnet_object.cidr_string)
+    network_int = address_int & _prefix_mask_v4(prefixlen)
 
-    conflicting_subnets = check_inventory_for_conflicts(cidr=ipaddress.ip_network(subnet_object.cidr_string,
-                                                                                  strict=False))
+    # first check if conflict with a reserved subnet
+    if _RESERVED.overlapping(network_int, prefixlen):
+        print("Subnet is reserved or conflicts with a reserved subnet and cannot be added")
+        return
 
-    if conflicting_subnets:
-        while True:
-            verify = input("This subnet conflicts with one or more subnets already in the inventory. Are you sure you "
-                           "wish to add it? (Y/n): ")
-            if verify == "Y":
-                break
-            elif verify == "n":
-                print("Did not add subnet to inventory")
-                return
-            else:
-                print("Please select Y or n")
+    if conflicting_subnets is None:
+        conflicting_subnets = _conflict_rows(network_int=network_int, prefixlen=prefixlen)
 
-    to_add = "{name} {address}\n".format(name=subnet_object.name,
-                                         address=subnet_object.cidr_string)
+    if conflicting_subnets and not _prompt_yn(message="This subnet conflicts with one or more subnets already in the "
+                                                      "inventory. Are you sure you wish to add it? (Y/n): "):
+        print("Did not add subnet to inventory")
+        return
 
-    with open(INVENTORY_PATH, "a+") as f:
-        f.write(to_add)
+    connection = _get_connection()
+    try:
+        with connection:
+            connection.execute(_INSERT_SUBNET, _subnet_values(name=subnet_object.name, address_int=address_int,
+                                                              prefixlen=prefixlen))
+    except sqlite3.IntegrityError:
+        # the name was taken since it was checked
+        print("ERROR: Name already in use.  Did not add subnet to inventory")
+        return
 
-    print("Subnet added to inventory: {subnet}".format(subnet=to_add))
+    print("Subnet added to inventory: {name} {address}\n".format(name=subnet_object.name,
+                                                                 address=subnet_object.cidr_string))
 
 
 def check_subnet_by_address(cidr_string=None):
@@ -84,22 +541,20 @@ def check_subnet_by_address(cidr_string=None):
     Returns:
         Boolean:
             True if CIDR address is in inventory
-            False otherwise
+            False otherwise, including when the inventory has not yet been created
 
     Raises:
-        FileNotFoundError if inventory has not yet been created
+        None
     """
-    try:
-        with open(INVENTORY_PATH, "r") as f:
-            inventory = f.readlines()
-    except FileNotFoundError:
+    # an address that is not in CIDR format can never have been added to the inventory
+    if not _inventory_exists() or not check_address_format(cidr_string=cidr_string):
         return False
 
-    for inventory_address in inventory:
-        if inventory_address.rsplit(' ', 1)[1].strip() == cidr_string:
-            return True
+    address_int, prefixlen = _split_cidr_v4(cidr_string)
 
-    return False
+    row = _get_connection().execute("SELECT 1 FROM subnets WHERE address = ? AND prefixlen = ? LIMIT 1",
+                                    (address_int, prefixlen)).fetchone()
+    return row is not None
 
 
 def check_subnet_by_name(name_to_check=None):
@@ -111,116 +566,153 @@ def check_subnet_by_name(name_to_check=None):
      Returns:
          Boolean:
              True if name is in inventory
-             False otherwise
+             False otherwise, including when the inventory has not yet been created
 
      Raises:
-         FileNotFoundError if inventory has not yet been created
+         None
      """
-    try:
-        with open(INVENTORY_PATH, "r") as f:
-            inventory = f.readlines()
-    except FileNotFoundError:
+    if not _inventory_exists():
         return False
+    return names_conflict(chosen_name=name_to_check)
+
 
-    for inventory_address in inventory:
-        if inventory_address.rsplit(' ', 1)[0] == name_to_check:
-            return True
+def check_inventory_for_conflicts(cidr=None):
+    """Checks the inventory for all subnet conflicts
+
+    Args:
+        cidr: ipaddress.ip_network object representing the subnet to check for conflicts against
 
-    return False
+    Returns:
+        conflict_list: list of Subnet objects that conflict in the inventory
 
+    Raises:
+        None
+    """
+    # the inventory only holds IPv4 subnets
+    if cidr.version != 4:
+        return []
+    return [Subnet(name=name, cidr_string=_format_cidr_v4(address_int, prefixlen))
+            for name, address_int, prefixlen in _conflict_rows(network_int=int(cidr.network_address),
+                                                                prefixlen=cidr.prefixlen)]
 
-def subnets_conflict(cidr1=None, cidr2=None):
-    """Checks whether two subnets overlap
+
+def names_conflict(chosen_name=None):
+    """Checks whether a chosen name is already used
 
     Args:
-        cidr1: ipaddress.ip_network object representing the first subnet to compare
-        cidr2: ipaddress.ip_network object representing the second subnet to compare
+        chosen_name: String representing the name to be used for a subnet
 
     Returns:
         Boolean:
-            True if cidr1 is partly or wholly contained in cidr2 or cidr2 is wholly contained in cidr1.
+            True if name is already used
             False otherwise
 
     Raises:
-        None
+        FileNotFoundError if inventory has not yet been created
     """
-    return cidr1.overlaps(cidr2)
+    row = _get_connection().execute("SELECT 1 FROM subnets WHERE name = ?", (chosen_name,)).fetchone()
+    return row is not None
 
 
-def check_inventory_for_conflicts(cidr=None):
-    """Checks the inventory for all subnet conflicts
+def _is_decimal(text=None, max_digits=None):
+    """Checks whether a string is a short run of ASCII decimal digits with no leading zero, which int() would also
+    accept with signs, underscores, whitespace or other scripts' digits, and which ipaddress rejects in octets
 
     Args:
-        cidr: ipaddress.ip_network object representing the subnet to check for conflicts against
+        text: String to check
+        max_digits: Integer, the most digits allowed
 
     Returns:
-        conflict_list: list of Subnet objects that conflict in the inventory
+        Boolean:
+            True if text is between 1 and max_digits ASCII digits and is either "0" or does not start with a zero
+            False otherwise
 
     Raises:
         None
     """
-    with open(INVENTORY_PATH, "r") as f:
-        inventory = f.readlines()
-
-    conflict_list = []
-    for inventory_address in inventory:
-        cidr_string_to_compare = inventory_address.rsplit(' ', 1)[1].strip()
-        if subnets_conflict(cidr, ipaddress.ip_network(cidr_string_to_compare, strict=False)):
-            conflict_list.append(Subnet(name=inventory_address.rsplit(' ', 1)[0],
-                                        cidr_string=cidr_string_to_compare))
-
-    return conflict_list
+    return (0 < len(text) <= max_digits and text.isascii() and text.isdigit()
+            and (text == "0" or not text.startswith("0")))
 
 
-def names_conflict(chosen_name=None):
-    """Checks whether a chosen name is already used
+def check_address_format(cidr_string=None):
+    """Verifies that a given address is in proper CIDR format
 
     Args:
-        chosen_name: String representing the name to be used for a subnet
+        cidr_string: String representing the address to be used for a subnet
 
     Returns:
         Boolean:
-            True if name is already used
+            True if address is in CIDR format with octets of at most 255 and a prefix length of at most 32
             False otherwise
 
     Raises:
         None
     """
-    with open(INVENTORY_PATH, "r") as f:
-        inventory = f.readlines()
+    address, slash, prefix = cidr_string.partition('/')
+    octets = address.split('.')
+    if not slash or len(octets) != 4 or not _is_decimal(prefix, max_digits=2) or int(prefix) > 32:
+        return False
+    return all(_is_decimal(octet, max_digits=3) and int(octet) < 256 for octet in octets)
 
-    for inventory_address in inventory:
-        if chosen_name == inventory_address.rsplit(' ', 1)[0]:
-            return True
 
-    return False
+def _scan_inventory_for_add(cidr_string=None):
+    """Checks whether an address for a new subnet is already in the inventory and finds the subnets it conflicts
+    with, in a single query, since a subnet already in the inventory is one of the subnets the address conflicts
+    with
 
+    Args:
+        cidr_string: String representing the address to be used for a subnet, in CIDR format
 
-def check_address_format(cidr_string=None):
-    """Verifies that a given address is in proper CIDR format
+    Returns:
+        Tuple: (address_exists, conflict_list) where address_exists is True if the address is already in the
+        inventory and conflict_list is a list of Subnet objects that conflict in the inventory
+
+    Raises:
+        FileNotFoundError if inventory has not yet been created
+    """
+    address_int, prefixlen = _split_cidr_v4(cidr_string)
+
+    address_exists = False
+    conflict_list = []
+    for inventory_name, inventory_address_int, inventory_prefixlen in _conflict_rows(
+            network_int=address_int & _prefix_mask_v4(prefixlen), prefixlen=prefixlen):
+        if inventory_address_int == address_int and inventory_prefixlen == prefixlen:
+            address_exists = True
+        conflict_list.append(Subnet(name=inventory_name,
+                                    cidr_string=_format_cidr_v4(inventory_address_int, inventory_prefixlen)))
+
+    return address_exists, conflict_list
+
+
+def _validate_and_check(cidr_string=None):
+    """Checks that an address for a new subnet is in CIDR format and is not already in the inventory
 
     Args:
         cidr_string: String representing the address to be used for a subnet
 
     Returns:
-        Boolean:
-            True if address is in CIDR format
-            False otherwise
+        Tuple: (ok, reason, conflict_list) where ok is True if the address can be used for a new subnet, reason is
+        the message to show the user when it cannot, None otherwise, and conflict_list is a list of Subnet objects
+        in the inventory that the address conflicts with
 
     Raises:
         None
     """
-    cidr_pattern = r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}/\d{1,2}"
-    if re.search(cidr_pattern, cidr_string):
-        return True
-    return False
+    if not check_address_format(cidr_string=cidr_string):
+        return (False, "ERROR: Address is not in CIDR format.  Addresses must be in CIDR format, e.g. 10.0.0.0/8",
+                [])
+    address_exists, conflict_list = _scan_inventory_for_add(cidr_string=cidr_string)
+    if address_exists:
+        return False, "Subnet already in inventory.", conflict_list
+    return True, None, conflict_list
 
 
-def display_inventory():
-    """Displays the full contents of the inventory to the user
+def display_inventory(start=0, count=None):
+    """Displays the contents of the inventory to the user, in the order the subnets were added
 
     Args:
-        None
+        start: Integer, position in the inventory of the first subnet to display
+        count: Integer, number of subnets to display, or None to display every subnet from start onwards
 
     Returns:
         Void
@@ -228,14 +720,13 @@ def display_inventory():
     Raises:
         None
     """
-    with open(INVENTORY_PATH, 'r') as f:
-        inventory = f.readlines()
-
     print("Subnet Name - Subnet Address")
-    for line in inventory:
-        split_line = line.rsplit(' ', 1)
-        print("{name} - {address}".format(name=split_line[0],
-                                          address=split_line[1].strip()))
+    # a negative LIMIT means no limit to SQLite, and the rows are fetched from the cursor as they are printed
+    rows = _get_connection().execute("SELECT name, address, prefixlen FROM subnets ORDER BY rowid LIMIT ? OFFSET ?",
+                                     (-1 if count is None else count, start))
+    for name, address_int, prefixlen in rows:
+        print("{name} - {address}".format(name=name,
+                                          address=_format_cidr_v4(address_int, prefixlen)))
 
 
 def delete_subnet(delete_name=None):
@@ -250,18 +741,34 @@ def delete_subnet(delete_name=None):
     Raises:
         None
     """
-    with open(INVENTORY_PATH, "r+") as f:
-        inventory = f.readlines()
-        f.seek(0)
-        for inventory_address in inventory:
-            inventory_name = inventory_address.rsplit(' ', 1)[0]
-            if inventory_name != delete_name:
-                f.write(inventory_address)
-        f.truncate()
+    connection = _get_connection()
+    with connection:
+        connection.execute("DELETE FROM subnets WHERE name = ?", (delete_name,))
     # TODO: Should display the deleted address in addition to the name to the user
     print("{name} subnet removed from inventory".format(name=delete_name))
 
 
+def _non_negative_int(value=None):
+    """Converts a command line argument to a non-negative integer
+
+    Args:
+        value: String given on the command line
+
+    Returns:
+        Integer: the converted value
+
+    Raises:
+        argparse.ArgumentTypeError if value is not a non-negative integer
+    """
+    try:
+        converted = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("{value} is not an integer".format(value=value))
+    if converted < 0:
+        raise argparse.ArgumentTypeError("{value} must not be negative".format(value=value))
+    return converted
+
+
 def setup_parser():
     """Setup for command line interface arguments
 
@@ -292,26 +799,44 @@ def setup_parser():
     exclusive_parser.add_argument("-l", "--list",
                                   help="List all subnets in inventory",
                                   action="store_true", )
+    parser.add_argument("-s", "--start",
+                        help="With --list, position of the first subnet to list, starting from 0",
+                        type=_non_negative_int,
+                        default=None, )
+    parser.add_argument("-n", "--count",
+                        help="With --list, maximum number of subnets to list",
+                        type=_non_negative_int,
+                        default=None, )
     return parser
 
 def initialization_check():
-    if not os.path.exists(INVENTORY_PATH):
+    if not _inventory_exists():
         print("Subnet inventory does not exist.  Please run the setup script to initialize the system.  "
               "See README for more details.")
         sys.exit(1)
 
+    try:
+        if _migrate_flat_inventory():
+            print("Converted the inventory to a database.  The previous inventory was kept at "
+                  "{path}.old".format(path=INVENTORY_PATH))
+    except ValueError as e:
+        print("ERROR: The inventory could not be converted to a database: {error}".format(error=e))
+        sys.exit(1)
+
 # TODO: This user interface only prompts the user once and exits.  It may be preferable to the user to be able
 #  to perform multiple actions without exiting the program each time
 if __name__ == '__main__':
     initialization_check()
-    args = setup_parser()
+    parser = setup_parser()
 
     # show help message if no arguments supplied
     if len(sys.argv) == 1:
-        args.print_help(sys.stderr)
+        parser.print_help(sys.stderr)
         sys.exit(1)
 
-    args = setup_parser().parse_args()
+    args = parser.parse_args()
+    if not args.list and (args.start is not None or args.count is not None):
+        parser.error("-s/--start and -n/--count can only be used with -l/--list")
 
     subnet = Subnet()
     # TODO: Lots of prompt reuse between arguments, would be better to break this out user prompts to a dedicated method
@@ -327,17 +852,13 @@ if __name__ == '__main__':
 
         while True:
             cidr_addr_string = input("Please enter your subnet in CIDR notation: ")
-            # TODO: if nest, there is probably a cleaner way to do this
-            if check_address_format(cidr_string=cidr_addr_string):
-                if not check_subnet_by_address(cidr_string=cidr_addr_string):
-                    subnet.cidr_string = cidr_addr_string
-                    break
-                else:
-                    print("Subnet already in inventory.")
-            else:
-                print("ERROR: Address is not in CIDR format.  Addresses must be in CIDR format, e.g. 10.0.0.0/8")
+            address_ok, reason, conflicts = _validate_and_check(cidr_string=cidr_addr_string)
+            if address_ok:
+                subnet.cidr_string = cidr_addr_string
+                break
+            print(reason)
 
-        add_subnet(subnet_object=subnet)
+        add_subnet(subnet_object=subnet, conflicting_subnets=conflicts)
     elif args.query:
         print("Checking for subnet in inventory")
         cidr_addr_string = input("Please enter the subnet you would like to check in CIDR notation: ")
@@ -364,23 +885,16 @@ if __name__ == '__main__':
             print("ERROR: Address is not in CIDR format.  Addresses must be in CIDR format, e.g. 10.0.0.0/8")
     elif args.list:
         print("Displaying all subnets")
-        display_inventory()
+        display_inventory(start=args.start or 0, count=args.count)
     elif args.delete:
         print("Deleting subnet")
         subnet_name = input("Please enter the name of the subnet you would like to delete: ")
         if check_subnet_by_name(name_to_check=subnet_name):
             # Ensure the user really wants to delete the subnet
-            while True:
-                confirm = input("Are you sure you want to delete the {name} subnet? This action cannot be undone. "
-                                "(Y/n): ".format(name=subnet_name))
-                if confirm == "Y":
-                    delete_subnet(subnet_name)
-                    break
-                elif confirm == "n":
-                    print("Subnet not deleted")
-                    break
-                else:
-                    print("Please select Y or n")
-
+            if _prompt_yn(message="Are you sure you want to delete the {name} subnet? This action cannot be undone. "
+                                  "(Y/n): ".format(name=subnet_name)):
+                delete_subnet(subnet_name)
+            else:
+                print("Subnet not deleted")
         else:
             print("No subnet with that name found in inventory")
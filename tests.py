@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 
+import contextlib
+import io
+import ipaddress
+import os
+import shutil
+import stat
+import tempfile
 import unittest
 import subnet_inventory
-from subprocess import check_output
+from subprocess import DEVNULL, PIPE, check_output, run
+from unittest import mock
 
 
 # Unit Tests
@@ -16,6 +24,191 @@ class TestFormatting(unittest.TestCase):
         incorrect_format = "10.0.0.0"
         self.assertFalse(subnet_inventory.check_address_format(cidr_string=incorrect_format))
 
+    def test_address_format_trailing_characters(self):
+        trailing_format = "10.0.0.0/24 trailing"
+        self.assertFalse(subnet_inventory.check_address_format(cidr_string=trailing_format))
+
+    def test_address_format_out_of_range(self):
+        self.assertFalse(subnet_inventory.check_address_format(cidr_string="10.0.256.0/24"))
+        self.assertFalse(subnet_inventory.check_address_format(cidr_string="10.0.0.0/33"))
+
+    def test_address_format_leading_zero(self):
+        self.assertFalse(subnet_inventory.check_address_format(cidr_string="010.0.0.0/24"))
+        self.assertTrue(subnet_inventory.check_address_format(cidr_string="10.0.0.0/0"))
+
+
+class TestParseCidr(unittest.TestCase):
+
+    def test_parse_cidr_v4_clears_host_bits(self):
+        self.assertEqual(subnet_inventory._parse_cidr_v4("10.1.2.3/16"), (0x0A010000, 0xFFFF0000, 16))
+
+    def test_parse_cidr_v4_invalid(self):
+        self.assertRaises(ValueError, subnet_inventory._parse_cidr_v4, "10.0.0.256/24")
+        self.assertRaises(ValueError, subnet_inventory._parse_cidr_v4, "2001:db8::/32")
+
+
+class TestFlatInventory(unittest.TestCase):
+
+    def test_read_text_inventory(self):
+        data = b"test subnet 10.1.2.3/16\n\nother 192.168.0.0/24\n"
+        self.assertEqual(subnet_inventory._read_flat_inventory(data=data),
+                         [("test subnet", 0x0A010203, 16), ("other", 0xC0A80000, 24)])
+
+    def test_read_record_inventory(self):
+        data = subnet_inventory._RECORD.pack(b"test subnet", 0x0A010203, 16)
+        self.assertEqual(subnet_inventory._read_flat_inventory(data=data), [("test subnet", 0x0A010203, 16)])
+
+    def test_read_inventory_duplicate_name(self):
+        data = b"test 10.0.0.0/8\ntest 11.0.0.0/8\n"
+        self.assertRaises(ValueError, subnet_inventory._read_flat_inventory, data=data)
+
+    def test_read_inventory_partial_record(self):
+        data = subnet_inventory._RECORD.pack(b"test", 0x0A000000, 8) * 2
+        self.assertRaises(ValueError, subnet_inventory._read_flat_inventory, data=data[:-20])
+
+
+class TestMigrateInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.original_path = subnet_inventory.INVENTORY_PATH
+        subnet_inventory.INVENTORY_PATH = os.path.join(self.directory, "inventory")
+
+    def tearDown(self):
+        subnet_inventory.INVENTORY_PATH = self.original_path
+        shutil.rmtree(self.directory)
+
+    def write_inventory(self, data):
+        with open(subnet_inventory.INVENTORY_PATH, "wb") as f:
+            f.write(data)
+        os.chmod(subnet_inventory.INVENTORY_PATH, 0o640)
+
+    def read_inventory(self):
+        with open(subnet_inventory.INVENTORY_PATH, "rb") as f:
+            return f.read()
+
+    def test_migrate_text_inventory(self):
+        data = b"test 10.1.2.3/16\n"
+        self.write_inventory(data=data)
+        self.assertTrue(subnet_inventory._migrate_flat_inventory())
+
+        connection = subnet_inventory._connect(path=subnet_inventory.INVENTORY_PATH)
+        try:
+            self.assertEqual(connection.execute("SELECT name, address, prefixlen FROM subnets").fetchall(),
+                             [("test", 0x0A010203, 16)])
+        finally:
+            connection.close()
+        self.assertEqual(stat.S_IMODE(os.stat(subnet_inventory.INVENTORY_PATH).st_mode), 0o640)
+        with open(subnet_inventory.INVENTORY_PATH + ".old", "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_migrate_leaves_database_and_empty_file(self):
+        self.write_inventory(data=b"")
+        self.assertFalse(subnet_inventory._migrate_flat_inventory())
+        self.assertEqual(self.read_inventory(), b"")
+
+        self.write_inventory(data=b"test 10.0.0.0/8\n")
+        subnet_inventory._migrate_flat_inventory()
+        database = self.read_inventory()
+        self.assertFalse(subnet_inventory._migrate_flat_inventory())
+        self.assertEqual(self.read_inventory(), database)
+
+    def test_migrate_failure_leaves_inventory(self):
+        data = b"test 10.0.0.0/8\n"
+        self.write_inventory(data=data)
+        with mock.patch.object(shutil, "copy2", side_effect=OSError("disk full")):
+            self.assertRaises(OSError, subnet_inventory._migrate_flat_inventory)
+        self.assertEqual(os.listdir(self.directory), ["inventory"])
+        self.assertEqual(self.read_inventory(), data)
+
+        self.write_inventory(data=b"test 10.0.0.0/8\ntest 11.0.0.0/8\n")
+        self.assertRaises(ValueError, subnet_inventory._migrate_flat_inventory)
+        self.assertEqual(os.listdir(self.directory), ["inventory"])
+
+
+class TestConflicts(unittest.TestCase):
+
+    def setUp(self):
+        subnet_inventory._CONNECTION = subnet_inventory._connect(path=":memory:")
+        for name, cidr_string in [("supernet", "10.0.0.0/8"), ("subnet", "10.1.2.0/24"), ("other", "192.168.0.0/16"),
+                                  ("everything", "0.0.0.0/0")]:
+            subnet_inventory._CONNECTION.execute(subnet_inventory._INSERT_SUBNET, subnet_inventory._subnet_values(
+                name, *subnet_inventory._split_cidr_v4(cidr_string)))
+
+    def tearDown(self):
+        subnet_inventory._CONNECTION.close()
+        subnet_inventory._CONNECTION = None
+
+    def conflicts(self, cidr_string):
+        return [conflict.name for conflict in
+                subnet_inventory.check_inventory_for_conflicts(cidr=ipaddress.ip_network(cidr_string))]
+
+    def test_conflicts_supernets_and_subnets(self):
+        self.assertEqual(self.conflicts("10.1.0.0/16"), ["everything", "supernet", "subnet"])
+
+    def test_conflicts_last_block_of_supernet(self):
+        self.assertEqual(self.conflicts("10.255.255.0/24"), ["everything", "supernet"])
+
+    def test_conflicts_everything(self):
+        self.assertEqual(len(self.conflicts("0.0.0.0/0")), 4)
+
+    def test_scan_inventory_for_add_existing_address(self):
+        address_exists, conflicts = subnet_inventory._scan_inventory_for_add(cidr_string="10.1.2.0/24")
+        self.assertTrue(address_exists)
+        self.assertEqual([conflict.name for conflict in conflicts], ["everything", "supernet", "subnet"])
+
+    def test_check_subnet_by_address_requires_cidr_format(self):
+        self.assertTrue(subnet_inventory.check_subnet_by_address(cidr_string="10.1.2.0/24"))
+        self.assertFalse(subnet_inventory.check_subnet_by_address(cidr_string="10.1.2.0/+24"))
+        self.assertFalse(subnet_inventory.check_subnet_by_address(cidr_string="10.1.2.0"))
+
+
+class TestDisplayInventory(unittest.TestCase):
+
+    def setUp(self):
+        subnet_inventory._CONNECTION = subnet_inventory._connect(path=":memory:")
+        for position in range(5):
+            subnet_inventory._CONNECTION.execute(subnet_inventory._INSERT_SUBNET, subnet_inventory._subnet_values(
+                "subnet {position}".format(position=position), 0x0A000000 + (position << 8), 24))
+
+    def tearDown(self):
+        subnet_inventory._CONNECTION.close()
+        subnet_inventory._CONNECTION = None
+
+    def display(self, **kwargs):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            subnet_inventory.display_inventory(**kwargs)
+        return out.getvalue().splitlines()[1:]
+
+    def test_display_window(self):
+        self.assertEqual(self.display(start=1, count=2), ["subnet 1 - 10.0.1.0/24", "subnet 2 - 10.0.2.0/24"])
+
+    def test_display_from_start_to_end(self):
+        self.assertEqual(self.display(start=3), ["subnet 3 - 10.0.3.0/24", "subnet 4 - 10.0.4.0/24"])
+        self.assertEqual(len(self.display()), 5)
+        self.assertEqual(self.display(start=5, count=2), [])
+
+
+class TestPrefixTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = subnet_inventory._PrefixTrie(width=32)
+        for name, cidr_string in [("supernet", "10.0.0.0/8"), ("subnet", "10.1.2.0/24"), ("other", "192.168.0.0/16")]:
+            network_int, _, prefixlen = subnet_inventory._parse_cidr_v4(cidr_string)
+            self.trie.insert(network_int, prefixlen, subnet_inventory.Subnet(name=name, cidr_string=cidr_string))
+
+    def overlapping(self, cidr_string):
+        network_int, _, prefixlen = subnet_inventory._parse_cidr_v4(cidr_string)
+        return self.trie.overlapping(network_int, prefixlen)
+
+    def test_overlapping_finds_supernets_and_subnets(self):
+        found = self.overlapping("10.1.0.0/16")
+        self.assertEqual(sorted(entry.name for entry in found), ["subnet", "supernet"])
+
+    def test_overlapping_no_conflict(self):
+        self.assertEqual(self.overlapping("172.16.0.0/12"), [])
+
 
 # System Tests
 class TestSubnetConflictChecker(unittest.TestCase):
@@ -24,6 +217,11 @@ class TestSubnetConflictChecker(unittest.TestCase):
         out = check_output(["python3", "subnet_inventory.py", "-l"]).decode()
         self.assertIn("Displaying all subnets", out)
 
+    def test_paging_requires_list(self):
+        result = run(["python3", "subnet_inventory.py", "-q", "-n", "5"], stdin=DEVNULL, stdout=PIPE, stderr=PIPE)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn(b"can only be used with -l/--list", result.stderr)
+
 
 if __name__ == '__main__':
     unittest.main()